@@ -1,10 +1,18 @@
 from abc import *
+from collections import defaultdict
+from typing import Callable
 
-from sqlalchemy.engine import LegacyRow
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.sql import text
 
+from common.sqlalchemist.exceptions.DataSourceError import DataSourceError
 from common.sqlalchemist.factory.SqlSession import SqlSession
 
 
+# DAO 클래스 별로 캐시해 둘 호출 함수의 최대 개수
+_PREPARED_CACHE_SIZE = 512
+
+
 class AbstractDAO(metaclass=ABCMeta):
     """
     Data Access Object 추상 클래스
@@ -14,53 +22,137 @@ class AbstractDAO(metaclass=ABCMeta):
     def map(cls, inp: dict) -> list:
         """
          Data Source의 조회 결과를 dict 형식으로 변환(필요 시)
-         {"columns" : columns, "data" : list} =>
+         {"column_names" : columns, "data" : list} =>
          [{"column_name" : value, "column_name" : value, ...}, {"column_name" : value, "column_name" : value, ...}, {"column_name" : value, "column_name" : value, ...}, ...]
          :rtype: list
-         :param inp : 조회 결과({"columns" : columns, "data" : list})
+         :param inp : 조회 결과({"column_names" : columns, "data" : list})
          :return dict array
         """
-        arr = []
-        for data in inp["data"]:
-            arr.append(dict(zip(inp["columns"], data)))
-        return arr
+        columns = inp["column_names"]
+        return [dict(zip(columns, data)) for data in inp["data"]]
 
     @classmethod
     def hash_map(cls, inp: dict, key_column: str) -> dict:
         """
-         Data Source의 조회 결과를 dict 형식으로 변환(필요 시)
-         {"columns" : columns, "data" : list} =>
+         Data Source의 조회 결과를 key_column 값 별로 묶어 dict 형식으로 변환(필요 시)
+         각 그룹은 조회 결과의 순서를 유지합니다.
+         {"column_names" : columns, "data" : list} =>
          {"value1": [{"column_name" : value1, "column_name" : value, ...}],
           "value2": [{"column_name" : value2, "column_name" : value, ...}],
           "value3": [{"column_name" : value3, "column_name" : value, ...}], ...}
          :rtype: dict
-         :param inp : 조회 결과({"columns" : columns, "data" : list})
+         :param inp : 조회 결과({"column_names" : columns, "data" : list})
          :param key_column : hash key column
          :return dict
         """
-        arr: list = cls.map(inp)
-        res: dict = {}
-        for row in arr:
-            values: list = res.get(row[key_column])
-            if values is None:
-                values = []
-                res[row[key_column]] = values
-            values.append(row)
-        return res
+        # map() 으로 전체 목록을 만들지 않고, 한 번 순회하면서 묶을 때 dict 로 변환합니다.
+        res: defaultdict = defaultdict(list)
+        columns = inp["column_names"]
+        key_index = columns.index(key_column)
+        for row in inp["data"]:
+            res[row[key_index]].append(dict(zip(columns, row)))
+        return dict(res)
+
+    @classmethod
+    def index_map(cls, inp: dict, key_column: str, max_key: int) -> dict:
+        """
+         hash_map 과 같은 형식으로 변환하되, key_column 이 0 ~ max_key 범위의 정수일 때 사용
+         key 값을 hash 하지 않고 list 의 index 로 바로 사용하므로 hash_map 보다 빠릅니다.
+         {"column_names" : columns, "data" : list} =>
+         {0: [{"column_name" : 0, "column_name" : value, ...}],
+          1: [{"column_name" : 1, "column_name" : value, ...}], ...}
+         :rtype: dict
+         :param inp : 조회 결과({"column_names" : columns, "data" : list})
+         :param key_column : hash key column (0 이상 max_key 이하의 정수)
+         :param max_key : key_column 값의 최댓값
+         :return dict
+         :raises ValueError: key_column 값이 0 ~ max_key 범위를 벗어난 경우
+        """
+        buckets: list = [None] * (max_key + 1)
+        columns = inp["column_names"]
+        key_index = columns.index(key_column)
+        for row in inp["data"]:
+            key = row[key_index]
+            if not 0 <= key <= max_key:
+                raise ValueError(f"{key_column} value {key!r} is out of range 0..{max_key}")
+            bucket = buckets[key]
+            if bucket is None:
+                bucket = buckets[key] = []
+            bucket.append(dict(zip(columns, row)))
+        return {key: bucket for key, bucket in enumerate(buckets) if bucket is not None}
+
+    @classmethod
+    def columnar(cls, inp: dict) -> dict:
+        """
+         Data Source의 조회 결과를 컬럼 단위 list 로 변환(필요 시)
+         한 컬럼을 꺼내 집계하거나 numpy 배열로 바꾸는 등의 분석 작업에는 map() 보다 이 형식을 권장합니다.
+         {"column_names" : columns, "data" : list} =>
+         {"column_name" : [value, value, ...], "column_name" : [value, value, ...], ...}
+         :rtype: dict
+         :param inp : 조회 결과({"column_names" : columns, "data" : list})
+         :return dict
+        """
+        columns = inp["column_names"]
+        if not inp["data"]:
+            return {column: [] for column in columns}
+        return dict(zip(columns, map(list, zip(*inp["data"]))))
+
+    @classmethod
+    def prepare(cls, sql: str) -> Callable:
+        """
+         SQL 문을 미리 TextClause 로 만들어 두고, 이를 실행하는 호출 함수를 반환
+         호출 함수는 DAO 클래스 별로 캐시되며, 호출 시에는 SQL 문의 파싱이나 캐시 조회 없이 바로 실행합니다.
+         session 은 위치 인자로만 받으므로 :session 같은 bind 파라미터 이름과도 겹치지 않습니다.
+         ex) self.prepare("select * from tb where id = :id")(session, id=1)
+         :rtype: Callable
+         :param sql : 실행할 SQL 문
+         :return 호출 함수 (session, **params) -> {"column_names" : columns, "data" : list}
+                 (data 의 각 행은 tuple 이며, 결과 행이 없는 문이면 data 는 빈 list)
+        """
+        prepared: dict = cls.__dict__.get('_prepared')
+        if prepared is None:
+            prepared = {}
+            cls._prepared = prepared
+
+        caller = prepared.get(sql)
+        if caller is None:
+            # TextClause 는 dialect 와 무관하므로 한 번만 만들어 모든 호출에서 재사용합니다.
+            statement = text(sql)
+
+            def caller(session: SqlSession, /, **params) -> dict:
+                try:
+                    result = session.get_connection().execute(statement, params)
+                    if not result.returns_rows:
+                        return {'column_names': (), 'data': []}
+                    column_names = tuple(result.keys())
+                    data_array = [tuple(row) for row in result]  # DAO 밖으로 Row 객체를 내보내지 않습니다.
+                    return {'column_names': column_names, 'data': data_array}
+
+                except SQLAlchemyError as e:
+                    error = e.args
+                    error_code = e.code
+                    raise DataSourceError(f"database execute Error: {e}", e, error_code)
+
+            if len(prepared) < _PREPARED_CACHE_SIZE:
+                prepared[sql] = caller
+        return caller
 
     @abstractmethod
-    def select_one(self, session: SqlSession, **params) -> LegacyRow:
+    def select_one(self, session: SqlSession, **params) -> tuple:
         """
         세션 인스턴스를 통해 Data Source로부터 1개 데이터를 조회
+        결과를 dict 로 다룰 필요가 없다면 session.select_raw 사용을 권장합니다.
         :param session: SqlSession 인스턴스
         :param params: sql 파라미터 데이터 Keyword Arguments
-        :return: sqlalchemy.engine.LegacyRow
+        :return: tuple
         """
 
     @abstractmethod
     def select(self, session: SqlSession, **params) -> list:
         """
         세션 인스턴스를 통해 Data Source로부터 하나의 데이터를 조회
+        결과를 dict 로 다룰 필요가 없다면 session.select_raw 사용을 권장합니다.
+        id 목록처럼 한 컬럼만 조회한다면 session.select_column 사용을 권장합니다.
         :param session: SqlSession 인스턴스
         :param params: sql 파라미터 데이터 Keyword Arguments
         :return: list
@@ -1,39 +1,21 @@
 # -*- coding: utf-8 -*-
 import atexit
-from typing import Callable
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Iterable
 
 from sqlalchemy import create_engine
 from sqlalchemy.engine import Engine, Connection
 from sqlalchemy.pool import Pool
+from sqlalchemy.sql import text
+from sqlalchemy.sql.elements import TextClause
 
 from common.sqlalchemist.factory.SqlSession import SqlSession
 from common.sqlalchemist.exceptions.DataSourceError import DataSourceError
 
 
-def requires_init(func: Callable) -> Callable:
-    """
-    이 데코레이터가 적용된 메서드는 실행에 앞서 초기화 성공 여부를 검사합니다.
-    DataSource 이외의 다른 클래스의 메서드에 적용하면 안 됩니다.
-    :param func: 적용 대상 메서드
-    :return: wrapped function
-    """
-
-    def wrapper(*args, **kwargs):
-        # DataSource 이외의 다른 클래스의 메서드에 적용하면 안 됩니다.
-        if not args:
-            raise TypeError("this decorator should be applied to a instance method of DataSource class.")
-
-        # DataSource 이외의 다른 클래스의 메서드에 적용하면 안 됩니다.
-        self: DataSource = args[0]
-        if not isinstance(self, DataSource):
-            raise TypeError("this decorator should be applied to a instance method of DataSource class.")
-
-        # 현재 Connection Pool 의 가용성 체크
-        self.check_initialization()
-
-        return func(*args, **kwargs)
-
-    return wrapper
+logger = logging.getLogger(__name__)
 
 
 class DataSource:
@@ -49,23 +31,17 @@ class DataSource:
     # Session Pool 에 대한 참조
     _pool: Pool = None
 
+    # SQL 문 별 TextClause 캐시 (세션 간 공유)
+    _statement_cache: Callable[[str], TextClause] = None
+
+    # init 시점에 Pool 에 미리 연결해 둘 Connection 수
+    _pool_size: int = 0
+
     def __init__(self):
         """
         생성자 : 필요한 환경 구축 작업 수행
         """
 
-    def __del__(self):
-        """
-        소멸자 : 참조가 수거되는 시점에 호출됩니다.
-        혹여 DataSource 닫는 처리를 잊어버리더라도 빼먹지 않기 위함입니다.
-        :return:
-        """
-        try:
-            self.close()
-            print(f'del {self.__class__.__name__}')
-        except (Exception, BaseException) as e:
-            raise e
-
     def __enter__(self):
         """
         with 문 (context manager) 지원을 위한 정의
@@ -82,20 +58,22 @@ class DataSource:
         :param exc_tb:
         :return:
         """
-        try:
-            self.close()
-            print(f'exit {self.__class__.__name__}')
-        except (Exception, BaseException) as e:
-            raise e
+        self.close()
 
     def init(self, *args, **kwargs):
         """
         Database Connection Pool 초기화
         :param args: - Application Configuration // type: tuple
         :param kwargs: - Application Configuration // type: dict
+                       statement_cache_size 로 TextClause 캐시 크기를 지정할 수 있습니다. (기본값 512)
         :return: void
         """
 
+        # SQL 문 캐시 생성 : TextClause 는 생성 이후 변경되지 않으므로 세션 간에 공유해도 안전합니다.
+        self._statement_cache = lru_cache(maxsize=kwargs.pop('statement_cache_size', 512))(text)
+
+        self._pool_size = kwargs.get('pool_size', 0)
+
         # sqlalchemy engine 생성
         kwargs.update({'connect_args': {'connect_timeout': 10}})
         self._engine = create_engine(*args, **kwargs)
@@ -103,41 +81,108 @@ class DataSource:
         # engine 에 의해 생성된 Session Pool 참조 바인딩
         self._pool = self._engine.pool
 
-    @requires_init
+        # 혹여 DataSource 닫는 처리를 잊어버리더라도 프로세스 종료 시에는 닫히도록 등록합니다.
+        atexit.register(self.close)
+
+        # Pool 크기만큼 미리 연결한 뒤 바로 반환하여, 첫 세션들이 연결 수립을 기다리지 않도록 Pool 을 채워 둡니다.
+        # 연결의 보관/대기/상태 확인(pool_pre_ping, pool_recycle)은 그대로 Pool 이 담당합니다.
+        warmed = [self._pool.connect() for _ in range(self._pool_size)]
+        for connection in warmed:
+            connection.close()
+
     def get_session(self) -> SqlSession:
         """
         Data Source 로부터 가용 Connection 을 획득하고 세션 인스턴스를 반환
         :return: SqlSession
         """
 
+        # 현재 Connection Pool 의 가용성 체크
+        self.check_initialization()
+
+        # Pool 로부터 Connection 획득
+        connection: Connection = self._connect()
+
         # Session(연결 제어자) 생성
-        connection: Connection = self._engine.connect().execution_options(autocommit=False)
         session = SqlSession()
         session.init(self, connection)
         return session
 
-    @requires_init
+    def return_connection(self, connection: Connection):
+        """
+        세션이 사용을 마친 Connection 을 Pool 에 반환합니다.
+        남은 트랜잭션은 Pool 이 반환 시에 rollback 하며, Connection 을 기다리던 세션이 있으면 바로 넘겨받습니다.
+        :param connection: 세션이 사용하던 Connection
+        :return: void
+        """
+
+        connection.close()
+
     def release_session(self, session: SqlSession):
         """
-        세션을 Pool 에 반환
-        :param session: AbstractSession 인스턴스
+        세션을 닫아 사용 중인 Connection 을 즉시 반환
+        반환에 실패하면 Connection 이 새는 것을 알 수 있도록 로그를 남기고 예외를 다시 발생시킵니다.
+        :param session: SqlSession 인스턴스
         :return: void
         """
 
         try:
-            del session
-        except (Exception, BaseException) as e:
-            print(e)
+            session.close()
+        except Exception:
+            logger.exception("failed to release session connection")
+            raise
+
+    def map_sessions(self, tasks: Iterable[Callable[[SqlSession], Any]], max_workers: int = None) -> list:
+        """
+        서로 독립적인 작업들을 각자의 세션에서 동시에 실행하고 결과를 tasks 순서대로 반환
+        각 작업은 SqlSession 하나를 인자로 받는 함수이며, 세션은 작업이 끝나면 Data Source 에 반환됩니다.
+        가용 Connection 보다 작업이 많으면(세션을 사용하는 도중에 호출하거나 max_workers 가 pool_size 보다 큰 경우 등)
+        남은 작업은 다른 작업이 반환한 Connection 을 Pool 에서 기다렸다가 이어서 실행됩니다.
+        :param tasks: 실행할 작업 목록
+        :param max_workers: 동시에 실행할 작업 수 (기본값은 pool_size)
+        :return: list
+        """
+
+        with ThreadPoolExecutor(max_workers=max_workers or self._pool_size or None) as executor:
+            return list(executor.map(self._run, tasks))
+
+    def _run(self, task: Callable[[SqlSession], Any]) -> Any:
+        """
+        세션을 획득하여 작업을 실행하고 세션을 반환합니다.
+        :param task: 실행할 작업
+        :return: 작업 결과
+        """
+
+        with self.get_session() as session:
+            return task(session)
 
-    @requires_init
     def close(self):
         """
         Connection Pool 종료 처리
         !!! 어플리케이션 종료 시점에 이 메서드가 반드시 호출되어야 함 !!!
         :return: void
         """
+        if self._engine is None:
+            return
+        atexit.unregister(self.close)
         self._engine.dispose()  # 내부적으로 pool 객체도 함께 dispose 처리됩니다.
 
+    def _connect(self) -> Connection:
+        """
+        engine 으로부터 autocommit = False 인 Connection 을 새로 획득합니다.
+        :return: Connection
+        """
+
+        return self._engine.connect().execution_options(autocommit=False)
+
+    def get_statement(self, sql: str) -> TextClause:
+        """
+        SQL 문을 text() 로 감싼 TextClause 객체를 캐시로부터 반환합니다.
+        :param sql: SQL 문
+        :return: TextClause
+        """
+
+        return self._statement_cache(sql)
+
     def check_initialization(self):
         """
         sqlalchemy 엔진(Connection pool) 의 상태를 점검하고 이상이 있으면 예외를 발생시킵니다.
@@ -1,39 +1,63 @@
 # -*- coding: utf-8 -*-
-from typing import Callable, Iterable
+import io
+import re
+import uuid
+from collections.abc import Mapping
+from functools import lru_cache
+from itertools import islice
+from typing import Iterable, Iterator, Sequence
 
 from sqlalchemy.engine import Connection
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import Session
-from sqlalchemy.sql import text
+from sqlalchemy.sql.elements import TextClause
 
 from common.sqlalchemist.exceptions.DataSourceError import DataSourceError
 
 
-def check_needed(func: Callable) -> Callable:
-    """
-    이 데코레이터가 적용된 메서드는 실행에 앞서 Connection 객체의 가용성 여부를 검사합니다.
-    SqlSession 이외의 다른 클래스의 메서드에 적용하면 안 됩니다.
-    :param func: 적용 대상 메서드
-    :return: wrapped function
-    """
+# 조회 쿼리문을 LIMIT 1 로 감쌀 수 있는 dialect 목록
+# mysql/mariadb 는 derived table 의 중복 컬럼 이름을 허용하지 않고, mariadb 는 subquery 의 ORDER BY 를 무시하며,
+# sqlite 는 derived table 의 중복 컬럼 이름을 바꾸어(id -> id:1) select 와 컬럼 이름이 달라지므로 제외합니다.
+_LIMIT_DIALECTS = ('postgresql',)
 
-    def wrapper(*args, **kwargs):
+# 쿼리문에 LIMIT 절이 이미 포함되어 있는지 검사하기 위한 정규식
+_LIMIT_PATTERN = re.compile(r'\blimit\s+(\d+|:\w+)', re.IGNORECASE)
 
-        # SqlSession 이외의 다른 클래스의 메서드에 적용하면 안 됩니다.
-        if not args:
-            raise TypeError("this decorator should be applied to a instance method of SqlSession class.")
+# SELECT 또는 WITH 로 시작하는 조회 쿼리문인지 검사하기 위한 정규식
+_SELECT_PATTERN = re.compile(r'\s*(\(\s*)*(select|with)\b', re.IGNORECASE)
 
-        # SqlSession 이외의 다른 클래스의 메서드에 적용하면 안 됩니다.
-        self: SqlSession = args[0]
-        if not args or not isinstance(self, SqlSession):
-            raise TypeError("this decorator should be applied to a instance method of SqlSession class.")
+# 행 잠금 절(FOR UPDATE, FOR SHARE 등)이 포함되어 있는지 검사하기 위한 정규식
+_LOCKING_PATTERN = re.compile(r'\bfor\s+(update|share|no\s+key\s+update|key\s+share)\b', re.IGNORECASE)
 
-        # 현재 커넥션의 가용성 체크
-        self.check_availability()
 
-        return func(*args, **kwargs)
+@lru_cache(maxsize=512)
+def _limit_one(sql: str) -> str:
+    """
+    LIMIT 절이 없는 조회 쿼리문을 한 레코드만 조회하도록 감쌉니다.
+    SELECT/WITH 로 시작하지 않는 문(INSERT ... RETURNING, SHOW, PRAGMA 등)이나
+    세미콜론이 남아있는 쿼리문, 그리고 subquery 로 감싸면 잠기는 행이 달라지는
+    FOR UPDATE/FOR SHARE 쿼리문은 그대로 반환합니다.
+    :param sql: 조회 쿼리문
+    :return: 한 레코드만 조회하는 쿼리문
+    """
 
-    return wrapper
+    body = sql.strip().rstrip(';')
+    if (not _SELECT_PATTERN.match(body) or _LIMIT_PATTERN.search(body) or _LOCKING_PATTERN.search(body)
+            or ';' in body):
+        return sql
+    # 쿼리문이 -- 주석으로 끝나더라도 닫는 괄호가 주석 처리되지 않도록 줄을 바꿉니다.
+    return f"SELECT * FROM (\n{body}\n) _sub LIMIT 1"
+
+
+def _copy_value(value) -> str:
+    """
+    PostgreSQL COPY 의 text 형식에 맞추어 값을 문자열로 변환합니다.
+    :param value: 변환할 값
+    :return: str
+    """
+
+    if value is None:
+        return '\\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
 
 
 class SqlSession:
@@ -48,9 +72,6 @@ class SqlSession:
     # 자신이 관리하는 Connection 에 대한 참조
     _connection: Connection = None
 
-    # 세션 객체
-    _session: Session = None
-
     def __init__(self):
         """
         생성자 : 필요한 환경 구축 작업 수행
@@ -68,21 +89,17 @@ class SqlSession:
         with 문 (context manager) 사용을 위한 정의
         보통 with 문 context 를 벗어나면 해당 session(connection) 도 닫힐 것으로 기대하기 때문에
         기대에 부응하도록 close 처리를 명시하였습니다.
-        혹여 깜빡 했을 경우를 위해서 close 전에 commit 도 한 번 호출해 주도록 하였습니다.
+        혹여 깜빡 했을 경우를 위해서 정상 종료 시에는 close 전에 commit 도 한 번 호출해 주고,
+        예외로 인해 벗어나는 경우에는 rollback 을 호출합니다.
         :return: void
         """
         try:
-            self.commit()
-        except (Exception, BaseException) as e:
-            print(e)
-        self.close()
-
-    def __del__(self):
-        """
-        소멸자 : 참조가 수거되는 시점에 호출됩니다.
-        :return: void
-        """
-        self.close()
+            if exc_type is None:
+                self.commit()
+            else:
+                self.rollback()
+        finally:
+            self.close()
 
     def init(self, data_source, connection: Connection):
         """
@@ -93,9 +110,7 @@ class SqlSession:
         """
         self._data_source = data_source
         self._connection = connection
-        self._session = Session(self._connection)
 
-    # @check_needed
     def commit(self):
         """
         commit
@@ -104,40 +119,50 @@ class SqlSession:
         만약 with 문을 활용하였다면 __exit__() 가 호출되면서 마지막에 한번 더 해주기는 합니다.
         :return: void
         """
-        self._session.commit()
+        transaction = self._connection.get_transaction()
+        if transaction is not None:
+            transaction.commit()
+        else:
+            self._connection.connection.commit()  # begin() 없이 실행된 작업은 DB-API 연결에서 commit 합니다.
 
-    # @check_needed
     def rollback(self):
         """
         rollback
         :return: void
         """
-        self._session.rollback()
+        transaction = self._connection.get_transaction()
+        if transaction is not None:
+            transaction.rollback()
+        else:
+            self._connection.connection.rollback()
 
     def close(self):
         """
-        생성된 Connection 을 Pool 에 반환합니다.
+        생성된 Connection 을 Data Source 에 반환합니다.
         :return: void
         """
-        try:
-            self._session.close()
-            self._connection.close()
-        except (Exception, BaseException) as e:
-            raise e
+        if self._connection is None:
+            return
+
+        # 같은 Connection 이 두 번 반환되지 않도록 참조를 먼저 끊습니다.
+        connection, self._connection = self._connection, None
+        transaction = connection.get_transaction()
+        if transaction is not None:
+            transaction.close()  # 끝나지 않은 트랜잭션은 rollback 됩니다.
+        self._data_source.return_connection(connection)
 
-    # @check_needed
     def select(self, sql: str, **params) -> dict:
         """
         Connection 객체를 통해 조회 쿼리문을 실행
         :param sql: 실행할 조회 쿼리문
         :param params: 쿼리문 구성에 필요한 파라마티
-        :return: 조회 결과 dict 객체
+        :return: 조회 결과 dict 객체 (data 의 각 행은 tuple)
         """
 
         try:
-            result = self._connection.execute(text(sql), params)
-            column_names = [desc[0] for desc in result.cursor.description]
-            data_array = result.fetchall()
+            result = self._connection.execute(self._stmt(sql), params)
+            column_names = tuple(result.keys())
+            data_array = [tuple(row) for row in result]  # Row 객체 대신 tuple 만 남겨 메모리를 줄입니다.
             return {'column_names': column_names, 'data': data_array}
 
         except SQLAlchemyError as e:
@@ -145,25 +170,27 @@ class SqlSession:
             error_code = e.code
             raise DataSourceError(f"database select Error: {e}", e, error_code)
 
-        except (Exception, BaseException) as e:
-            raise e
-
-        finally:
-            pass
-
-    # @check_needed
     def select_one(self, sql: str, **params) -> dict:
         """
         Connection 객체를 통해 조회 쿼리문을 실행하고 한 레코드만 조회
+        PostgreSQL 에서는 조회 쿼리문에 LIMIT 1 을 붙여 서버에서 한 레코드만 보내도록 하고,
+        그렇지 않은 dialect 에서는 서버 측 cursor 로 첫 레코드만 가져옵니다.
         :param sql: 실행할 조회 쿼리문
         :param params: 쿼리문 구성에 필요한 파라마티
-        :return: 조회 결과 dict 객체
+        :return: 조회 결과 dict 객체 (data 는 tuple, 결과가 없으면 None)
         """
 
+        if self._connection.dialect.name in _LIMIT_DIALECTS:
+            statement = self._stmt(_limit_one(sql))
+        else:
+            statement = self._stmt(sql).execution_options(stream_results=True)
+
         try:
-            result = self._connection.execute(text(sql), params)
-            column_names = [desc[0] for desc in result.cursor.description]
-            data_array = result.fetchone()
+            result = self._connection.execute(statement, params)
+            column_names = tuple(result.keys())
+            row = result.fetchone()
+            data_array = tuple(row) if row is not None else None
+            result.close()  # 남은 레코드를 기다리지 않고 cursor 를 닫습니다.
             return {'column_names': column_names, 'data': data_array}
 
         except SQLAlchemyError as e:
@@ -171,42 +198,217 @@ class SqlSession:
             error_code = e.code
             raise DataSourceError(f"database select Error: {e}", e, error_code)
 
-        except (Exception, BaseException) as e:
-            raise e
+    def select_column(self, sql: str, **params) -> list:
+        """
+        Connection 객체를 통해 한 컬럼만 조회하는 쿼리문을 실행하고 값 목록을 반환
+        id 목록처럼 한 컬럼만 필요한 경우 Row 객체나 컬럼 이름 없이 값만 받습니다.
+        :param sql: 실행할 조회 쿼리문
+        :param params: 쿼리문 구성에 필요한 파라마티
+        :return: 첫 번째 컬럼 값 list
+        """
+
+        try:
+            return self._connection.execute(self._stmt(sql), params).scalars().all()
+
+        except SQLAlchemyError as e:
+            error = e.args
+            error_code = e.code
+            raise DataSourceError(f"database select Error: {e}", e, error_code)
+
+    def select_scalar(self, sql: str, **params):
+        """
+        Connection 객체를 통해 count, exists 처럼 값 하나를 조회하는 쿼리문을 실행하고 그 값을 반환
+        결과가 없으면 None 을 반환하고, 두 레코드 이상이면 예외를 발생시킵니다.
+        :param sql: 실행할 조회 쿼리문
+        :param params: 쿼리문 구성에 필요한 파라마티
+        :return: 조회 결과 값
+        """
+
+        try:
+            return self._connection.execute(self._stmt(sql), params).scalar_one_or_none()
+
+        except SQLAlchemyError as e:
+            error = e.args
+            error_code = e.code
+            raise DataSourceError(f"database select Error: {e}", e, error_code)
+
+    def select_raw(self, sql: str, **params) -> dict:
+        """
+        sqlalchemy 를 거치지 않고 DB-API cursor 로 직접 조회 쿼리문을 실행
+        Row 객체 생성 등의 후처리가 없어 대량 조회 시 select 보다 빠릅니다.
+        (주의) 쿼리문의 파라미터는 드라이버의 paramstyle 을 따라야 합니다. (예: psycopg2 는 %(name)s)
+        :param sql: 실행할 조회 쿼리문
+        :param params: 쿼리문 구성에 필요한 파라마티
+        :return: 조회 결과 dict 객체 (data 의 각 행은 tuple)
+        """
+
+        cursor = self._raw_cursor()
+        try:
+            # 파라미터가 없으면 드라이버가 쿼리문의 % 를 포맷 문자로 해석하지 않도록 인자 없이 실행합니다.
+            if params:
+                cursor.execute(sql, params)
+            else:
+                cursor.execute(sql)
+            column_names = tuple(desc[0] for desc in cursor.description)
+            data_array = cursor.fetchall()
+            return {'column_names': column_names, 'data': data_array}
+
+        except self._connection.dialect.dbapi.Error as e:
+            raise DataSourceError(f"database select Error: {e}", e)
 
         finally:
-            pass
+            cursor.close()
+
+    def select_columnar(self, sql: str, as_numpy: bool = False, as_arrow: bool = False, **params):
+        """
+        DB-API cursor 로 조회 쿼리문을 실행하고 결과를 컬럼 단위로 묶어 반환
+        {"column_name" : list, "column_name" : list, ...}
+        as_numpy 가 True 이면 각 컬럼을 numpy.ndarray(dtype=object) 로 반환합니다. (numpy 설치 필요)
+        as_arrow 가 True 이면 pyarrow.Table 로 반환합니다. (pyarrow 설치 필요)
+        (주의) 쿼리문의 파라미터는 드라이버의 paramstyle 을 따라야 합니다. (예: psycopg2 는 %(name)s)
+        :param sql: 실행할 조회 쿼리문
+        :param as_numpy: 각 컬럼을 numpy.ndarray 로 반환할지 여부
+        :param as_arrow: pyarrow.Table 로 반환할지 여부
+        :param params: 쿼리문 구성에 필요한 파라마티
+        :return: 컬럼 이름 별 조회 결과 dict 객체 or pyarrow.Table
+        """
+
+        result = self.select_raw(sql, **params)
+        column_names = result['column_names']
+        data_array = result['data']
+
+        # 행 단위 tuple 목록을 컬럼 단위 tuple 목록으로 전치합니다.
+        columns = list(zip(*data_array)) if data_array else [()] * len(column_names)
+
+        if as_arrow:
+            import pyarrow
+            return pyarrow.table(dict(zip(column_names, map(list, columns))))
+
+        if not as_numpy:
+            return dict(zip(column_names, map(list, columns)))
+
+        import numpy
+        res: dict = {}
+        for column_name, values in zip(column_names, columns):
+            # 값 자체가 sequence 인 컬럼도 1차원 배열이 되도록 빈 배열에 채워 넣습니다.
+            array = numpy.empty(len(values), dtype=object)
+            array[:] = values
+            res[column_name] = array
+        return res
 
-    # @check_needed
-    def insert(self, sql_template: str, data_list: Iterable):
+    def select_raw_iter(self, sql: str, size: int = 1000, **params) -> Iterator[dict]:
+        """
+        DB-API cursor 로 조회 쿼리문을 실행하고 결과를 size 건씩 나누어 반환하는 generator
+        드라이버가 지원하는 경우 서버 측 cursor 를 사용하므로 메모리에는 한 묶음만 올라옵니다.
+        (주의) 쿼리문의 파라미터는 드라이버의 paramstyle 을 따라야 합니다. (예: psycopg2 는 %(name)s)
+        :param sql: 실행할 조회 쿼리문
+        :param size: 한 번에 가져올 레코드 수
+        :param params: 쿼리문 구성에 필요한 파라마티
+        :return: 조회 결과 dict 객체 generator (data 의 각 행은 tuple)
+        """
+
+        cursor = self._raw_cursor(server_side=True)
+        try:
+            # 파라미터가 없으면 드라이버가 쿼리문의 % 를 포맷 문자로 해석하지 않도록 인자 없이 실행합니다.
+            if params:
+                cursor.execute(sql, params)
+            else:
+                cursor.execute(sql)
+            data_array = cursor.fetchmany(size)
+            # psycopg2 의 named cursor 는 첫 fetch 이후에 description 이 채워집니다.
+            column_names = tuple(desc[0] for desc in cursor.description)
+            while data_array:
+                yield {'column_names': column_names, 'data': data_array}
+                data_array = cursor.fetchmany(size)
+
+        except self._connection.dialect.dbapi.Error as e:
+            raise DataSourceError(f"database select Error: {e}", e)
+
+        finally:
+            cursor.close()
+
+    def insert(self, sql_template: str, data_list: Iterable, chunk_size: int = 1000):
         """
         Connection 객체를 통해 insert 문을 실행합니다.
+        data_list 를 chunk_size 건씩 나누어 executemany 로 실행하므로 generator 도 메모리에 모두 올리지 않으며,
+        모든 묶음은 하나의 트랜잭션으로 commit 됩니다.
         실행 성공 여부 값을 boolean 값으로 반환합니다.
         :param sql_template: 실행할 SQL 문
         :param data_list: 데이터 배열 list<list> or list<dict>
+        :param chunk_size: 한 번에 실행할 레코드 수
         :return: bool
         """
 
-        result = True
+        if isinstance(data_list, Mapping):
+            data_list = [data_list]
 
         try:
-            self._session.execute(text(sql_template), data_list)
-            self.commit()
+            statement = self._stmt(sql_template)
+            iterator = iter(data_list)
+            with self._connection.begin():
+                while chunk := list(islice(iterator, chunk_size)):
+                    self._connection.execute(statement, chunk)
+            return True
 
         except SQLAlchemyError as e:
-            result = False
             error = e.args
             error_code = e.code
-            raise DataSourceError(f"database select Error: {e}", error_code)
+            raise DataSourceError(f"database insert Error: {e}", e, error_code)
+
+    def insert_bulk(self, table: str, columns: Sequence[str], rows: Iterable,
+                    use_copy: bool = False, chunk_size: int = 1000) -> bool:
+        """
+        DB-API cursor 를 통해 대량의 데이터를 한 번에 insert 합니다.
+        PostgreSQL(psycopg2) 은 execute_values, MySQL(pymysql, mysqldb) 은 executemany 로
+        여러 레코드를 한 번의 요청으로 전송하며, 그 외의 드라이버는 insert 로 처리합니다.
+        PostgreSQL 에서 use_copy 가 True 이면 COPY FROM STDIN 으로 전송합니다.
+        (이 경우 각 값은 str() 결과가 PostgreSQL 의 text 입력 형식과 같아야 합니다.)
+        실행 성공 여부 값을 boolean 값으로 반환합니다.
+        :param table: 대상 테이블 이름
+        :param columns: 대상 컬럼 이름 목록
+        :param rows: 데이터 배열 list<tuple> (각 tuple 은 columns 순서를 따름)
+        :param use_copy: PostgreSQL 에서 COPY 사용 여부
+        :param chunk_size: 한 번에 전송할 레코드 수
+        :return: bool
+        """
 
-        except (Exception, BaseException) as e:
-            result = False
-            raise e
+        driver = self._connection.dialect.driver
+        column_list = ', '.join(columns)
 
-        finally:
-            return result
+        if driver not in ('psycopg2', 'pymysql', 'mysqldb'):
+            values = ', '.join(f':{column}' for column in columns)
+            return self.insert(f"INSERT INTO {table} ({column_list}) VALUES ({values})",
+                               (dict(zip(columns, row)) for row in rows), chunk_size)
+
+        try:
+            # insert 와 같이 sqlalchemy 트랜잭션 안에서 실행하여 commit/rollback 을 Connection 에 맡깁니다.
+            with self._connection.begin():
+                cursor = self._connection.connection.cursor()
+                try:
+                    if driver == 'psycopg2' and use_copy:
+                        iterator = iter(rows)
+                        while chunk := list(islice(iterator, chunk_size)):
+                            lines = ''.join('\t'.join(map(_copy_value, row)) + '\n' for row in chunk)
+                            cursor.copy_expert(f"COPY {table} ({column_list}) FROM STDIN", io.StringIO(lines))
+                    elif driver == 'psycopg2':
+                        from psycopg2.extras import execute_values
+                        execute_values(cursor, f"INSERT INTO {table} ({column_list}) VALUES %s", rows,
+                                       page_size=chunk_size)
+                    else:
+                        values = ', '.join(['%s'] * len(columns))
+                        cursor.executemany(f"INSERT INTO {table} ({column_list}) VALUES ({values})", rows)
+                finally:
+                    cursor.close()
+            return True
+
+        except self._connection.dialect.dbapi.Error as e:
+            raise DataSourceError(f"database insert Error: {e}", e)
+
+        except SQLAlchemyError as e:
+            error = e.args
+            error_code = e.code
+            raise DataSourceError(f"database insert Error: {e}", e, error_code)
 
-    # @check_needed
     def execute(self, sql_template: str, **params):
         """
         Connection 객체를 통해 update, delete, truncate 등의 문을 실행합니다.
@@ -216,26 +418,16 @@ class SqlSession:
         :return: bool
         """
 
-        result = True
-
         try:
-            self._session.execute(text(sql_template), params)
-            self.commit()
+            with self._connection.begin():
+                self._connection.execute(self._stmt(sql_template), params)
+            return True
 
         except SQLAlchemyError as e:
-            result = False
             error = e.args
             error_code = e.code
-            raise DataSourceError(f"database select Error: {e}", error_code)
-
-        except (Exception, BaseException) as e:
-            result = False
-            raise e
-
-        finally:
-            return result
+            raise DataSourceError(f"database execute Error: {e}", e, error_code)
 
-    # @check_needed
     def execute_procedure(self, procedure_name: str, params):
         """
         todo: 작성 예정
@@ -245,14 +437,6 @@ class SqlSession:
         :return:
         """
 
-    def get_session(self) -> Session:
-        """
-        현재 SqlSession 객체 자신이 관리 중인 Session 객체를 반환합니다.
-        :return: Session
-        """
-
-        return self._session
-
     def get_connection(self) -> Connection:
         """
         현재 SqlSession 객체 자신이 관리 중인 Connection 객체를 반환합니다.
@@ -261,9 +445,37 @@ class SqlSession:
 
         return self._connection
 
-    def check_availability(self):
+    def _stmt(self, sql: str) -> TextClause:
+        """
+        SQL 문을 text() 로 감싼 TextClause 객체를 반환합니다.
+        같은 SQL 문을 매번 다시 파싱하지 않도록 Data Source 의 캐시를 사용합니다.
+        :param sql: SQL 문
+        :return: TextClause
+        """
+
+        return self._data_source.get_statement(sql)
+
+    def _raw_cursor(self, server_side: bool = False):
+        """
+        현재 Connection 이 사용 중인 DB-API 연결로부터 cursor 를 생성합니다.
+        server_side 가 True 이면 드라이버가 지원하는 경우 서버 측 cursor 를 생성합니다.
+        :param server_side: 서버 측 cursor 사용 여부
+        :return: DB-API cursor
+        """
+
+        raw = self._connection.connection
+        if server_side:
+            driver = self._connection.dialect.driver
+            if driver == 'psycopg2':
+                return raw.cursor(name=f'sqlalchemist_{uuid.uuid4().hex}')
+            if driver in ('pymysql', 'mysqldb'):
+                return raw.cursor(self._connection.dialect.dbapi.cursors.SSCursor)
+        return raw.cursor()
+
+    def health_check(self):
         """
         Connection 객체의 가용성 여부를 점검하고 이상이 있으면 예외를 발생시킵니다.
+        매 호출마다 검사하지 않으므로, 필요하다면 세션을 받은 직후에 한 번 호출해 주세요.
         :return: void
         """
         if not self.is_available: